@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Simple on-disk cache for DeepSeek completions.
+
+Repeat test runs post the exact same payload to the API, so an
+exact-match cache keyed on the request body returns the prior
+completion instantly and bills zero tokens.
+"""
+
+import hashlib
+import json
+import os
+import time
+
+CACHE_PATH = "/tmp/deepseek_cache.json"
+DEFAULT_TTL = 3600
+
+
+class LLMCache:
+    """Exact-match completion cache backed by a JSON file."""
+
+    def __init__(self, path=CACHE_PATH, ttl=DEFAULT_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = self._load()
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+    def _save(self):
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(self._entries, f)
+        os.replace(tmp, self.path)
+
+    @staticmethod
+    def key_for(payload):
+        """Stable key for a chat-completions request payload"""
+        canonical = json.dumps(payload, sort_keys=True)
+        return hashlib.sha256(canonical.encode()).hexdigest()
+
+    @staticmethod
+    def cacheable(payload):
+        """Only cache deterministic requests (temperature 0 or unset)"""
+        return not payload.get("temperature")
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry and time.time() - entry["ts"] < self.ttl:
+            self.hits += 1
+            return entry["content"]
+        self.misses += 1
+        return None
+
+    def set(self, key, content):
+        self._entries[key] = {"content": content, "ts": time.time()}
+        self._save()
+
+    def stats(self):
+        return f"{self.hits} hits / {self.misses} misses"
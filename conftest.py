@@ -0,0 +1,13 @@
+import os
+
+import pytest
+
+
+def pytest_collection_modifyitems(config, items):
+    """Skip live-network tests unless RUN_INTEGRATION is set"""
+    if os.environ.get("RUN_INTEGRATION"):
+        return
+    skip = pytest.mark.skip(reason="integration test; set RUN_INTEGRATION=1 to run")
+    for item in items:
+        if "integration" in item.keywords:
+            item.add_marker(skip)
@@ -0,0 +1,14 @@
+#!/usr/bin/env python3
+"""
+Shared configuration for the test scripts.
+
+Reading from the environment keeps the API key out of the source, and
+DEEPSEEK_URL can point at a caching proxy (e.g. a local LiteLLM
+instance) so every script gets transparent response caching without
+code changes.
+"""
+
+import os
+
+DEEPSEEK_API_KEY = os.environ.get("DEEPSEEK_API_KEY", "")
+DEEPSEEK_URL = os.environ.get("DEEPSEEK_URL", "https://api.deepseek.com/chat/completions")
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Offline unit tests for the completion cache and STOP-command parsing
+"""
+
+from cache import LLMCache
+from test_deepseek import STOP_RE
+
+
+def test_cache_roundtrip(tmp_path):
+    cache = LLMCache(path=str(tmp_path / "cache.json"), ttl=60)
+    payload = {"model": "deepseek-chat", "messages": [{"role": "user", "content": "hi"}]}
+    key = LLMCache.key_for(payload)
+    assert cache.get(key) is None
+    cache.set(key, "hello")
+    assert cache.get(key) == "hello"
+    assert cache.stats() == "1 hits / 1 misses"
+
+
+def test_cache_expiry(tmp_path):
+    cache = LLMCache(path=str(tmp_path / "cache.json"), ttl=0)
+    key = LLMCache.key_for({"model": "deepseek-chat"})
+    cache.set(key, "stale")
+    assert cache.get(key) is None
+
+
+def test_cache_key_is_order_independent():
+    a = LLMCache.key_for({"model": "deepseek-chat", "max_tokens": 500})
+    b = LLMCache.key_for({"max_tokens": 500, "model": "deepseek-chat"})
+    assert a == b
+
+
+def test_cacheable_skips_sampling_requests():
+    assert LLMCache.cacheable({"model": "deepseek-chat"})
+    assert LLMCache.cacheable({"model": "deepseek-chat", "temperature": 0})
+    assert not LLMCache.cacheable({"model": "deepseek-chat", "temperature": 0.7})
+
+
+def test_stop_regex_extracts_context_and_message():
+    content = 'Some preamble *[STOP]* CONTEXT: "insecure code" Stop writing to /etc/passwd.'
+    match = STOP_RE.search(content)
+    assert match
+    assert match.group(1) == "insecure code"
+    assert "Stop writing" in match.group(2)
+
+
+def test_stop_regex_ignores_plain_responses():
+    assert STOP_RE.search("Everything looks fine, proceeding.") is None
@@ -3,65 +3,137 @@
 Test DeepSeek API directly
 """
 
-import requests
-import json
+import atexit
+import re
 
-DEEPSEEK_API_KEY = "sk-57370a37c79f4b7db9dbd1e253c25b8b"
+import httpx
+import orjson
+import pytest
 
-def test_deepseek():
-    """Test DeepSeek API with a simple prompt"""
-    url = "https://api.deepseek.com/chat/completions"
-    
-    headers = {
+from cache import LLMCache
+from settings import DEEPSEEK_API_KEY, DEEPSEEK_URL
+from transport import transport
+
+CACHE = LLMCache()
+
+# Compiled once at import so repeated scans skip re's per-call cache lookup
+STOP_RE = re.compile(r'\*\[STOP\]\*\s*CONTEXT:\s*"([^"]+)"\s*([\s\S]+)')
+
+# Static prompt content, kept byte-identical across runs and placed before
+# anything dynamic so DeepSeek's server-side prefix caching can reuse it
+# (check usage.prompt_cache_hit_tokens in the response)
+SYSTEM_MSG = {
+    "role": "system",
+    "content": "You are a helpful assistant that can interact with OpenHands. You can use special commands like *[STOP]* CONTEXT: \"reason\" to stop the OpenHands agent and provide corrections."
+}
+STOP_INSTRUCTIONS = """I need you to review this task and provide guidance. If you see any issues with the approach or need to stop the OpenHands agent, use the command: *[STOP]* CONTEXT: "reason here" followed by your explanation."""
+
+# Immutable request skeleton built once; per-call payloads only append
+# the user message instead of re-allocating the whole dict
+_STATIC_PAYLOAD = {
+    "model": "deepseek-chat",
+    "messages": [SYSTEM_MSG],
+    "stream": True,
+    "max_tokens": 500
+}
+
+# Shared HTTP/2 client kept alive for the whole process: repeated and
+# concurrent calls multiplex over a single TCP/TLS connection instead of
+# paying a fresh handshake each time
+CLIENT = httpx.Client(
+    timeout=30,
+    transport=transport(
+        retries=3,
+        limits=httpx.Limits(max_connections=20, max_keepalive_connections=10)
+    ),
+    headers={
         "Authorization": f"Bearer {DEEPSEEK_API_KEY}",
         "Content-Type": "application/json"
     }
-    
-    # Test prompt similar to what we'd send
-    prompt = """Create a simple web server with Node.js. Monitor for security issues.
+)
+atexit.register(CLIENT.close)
+
+@pytest.mark.integration
+def test_deepseek():
+    """Test DeepSeek API with a simple prompt"""
+    url = DEEPSEEK_URL
+
+    # Test task similar to what we'd send
+    task = "Create a simple web server with Node.js. Monitor for security issues."
+    prompt = STOP_INSTRUCTIONS + "\n\n" + task
 
-I need you to review this task and provide guidance. If you see any issues with the approach or need to stop the OpenHands agent, use the command: *[STOP]* CONTEXT: "reason here" followed by your explanation."""
-    
     payload = {
-        "model": "deepseek-chat",
-        "messages": [
-            {"role": "system", "content": "You are a helpful assistant that can interact with OpenHands. You can use special commands like *[STOP]* CONTEXT: \"reason\" to stop the OpenHands agent and provide corrections."},
-            {"role": "user", "content": prompt}
-        ],
-        "stream": False,
-        "max_tokens": 500
+        **_STATIC_PAYLOAD,
+        "messages": _STATIC_PAYLOAD["messages"] + [{"role": "user", "content": prompt}]
     }
-    
+
     print("Testing DeepSeek API...")
     print(f"Prompt: {prompt[:100]}...")
-    
-    try:
-        response = requests.post(url, headers=headers, json=payload, timeout=30)
-        
-        if response.status_code == 200:
-            data = response.json()
-            content = data["choices"][0]["message"]["content"]
-            print(f"✓ Success! Response ({len(content)} chars):")
-            print("-" * 60)
-            print(content)
-            print("-" * 60)
-            
-            # Check for STOP command
-            if "*[STOP]*" in content:
-                print("\n⚠️  STOP command detected!")
-                import re
-                stop_match = re.search(r'\*\[STOP\]\*\s*CONTEXT:\s*"([^"]+)"\s*([\s\S]+)', content)
-                if stop_match:
-                    context = stop_match.group(1)
-                    message = stop_match.group(2)
-                    print(f"Context: {context}")
-                    print(f"Message: {message[:200]}...")
-        else:
-            print(f"✗ Error: {response.status_code}")
-            print(f"Response: {response.text}")
-            
-    except Exception as e:
-        print(f"✗ Exception: {e}")
+
+    # Identical payloads hit the on-disk cache and skip the API entirely
+    cache_key = LLMCache.key_for(payload)
+    content = CACHE.get(cache_key) if LLMCache.cacheable(payload) else None
+
+    if content is not None:
+        print(f"✓ Cache hit ({CACHE.stats()})")
+    else:
+        try:
+            with CLIENT.stream("POST", url, json=payload) as response:
+                if response.status_code != 200:
+                    body = response.read()
+                    print(f"✗ Error: {response.status_code}")
+                    print(f"Response: {body.decode(errors='replace')}")
+                    return
+
+                print(f"✓ Negotiated {response.http_version}")
+
+                # Scan the SSE stream incrementally so a STOP command is
+                # detected on its first chunk instead of after the full reply
+                content = ""
+                usage = None
+                stopped_early = False
+                for line in response.iter_lines():
+                    if not line or not line.startswith("data: "):
+                        continue
+                    chunk = line[len("data: "):]
+                    if chunk == "[DONE]":
+                        break
+                    obj = orjson.loads(chunk)
+                    usage = obj.get("usage") or usage
+                    delta = obj["choices"][0]["delta"].get("content") if obj["choices"] else None
+                    if delta:
+                        content += delta
+                        if STOP_RE.search(content):
+                            stopped_early = True
+                            break
+
+            if stopped_early:
+                print("✓ STOP marker seen mid-stream, aborted remaining completion")
+            prefix_hits = (usage or {}).get("prompt_cache_hit_tokens")
+            if prefix_hits:
+                print(f"✓ Prompt prefix cache hit: {prefix_hits} tokens")
+            # Only cache full completions
+            if not stopped_early and LLMCache.cacheable(payload):
+                CACHE.set(cache_key, content)
+
+        except Exception as e:
+            print(f"✗ Exception: {e}")
+            return
+
+    print(f"✓ Success! Response ({len(content)} chars):")
+    print("-" * 60)
+    print(content)
+    print("-" * 60)
+
+    # Check for STOP command: one regex pass instead of a substring
+    # scan followed by a second walk for the regex
+    stop_match = STOP_RE.search(content)
+    if stop_match:
+        print("\n⚠️  STOP command detected!")
+        context = stop_match.group(1)
+        message = stop_match.group(2)
+        print(f"Context: {context}")
+        print(f"Message: {message[:200]}...")
 
 if __name__ == "__main__":
-    test_deepseek()
\ No newline at end of file
+    test_deepseek()
@@ -4,31 +4,64 @@ Test the DeepSeek Agent flow manually
 This simulates what the Cloudflare Worker should do
 """
 
-import requests
-import json
-import time
+import asyncio
+import re
+import sys
+
+import httpx
+import orjson
+import pytest
+
+from cache import LLMCache
+from settings import DEEPSEEK_API_KEY, DEEPSEEK_URL
+from transport import async_transport
 
 # Configuration
-DEEPSEEK_API_KEY = "sk-57370a37c79f4b7db9dbd1e253c25b8b"
 OPENHANDS_API_URL = "https://openhands.anyapp.cfd/api/"
 
-def create_openhands_conversation(repository, branch, first_prompt):
+# Compiled once at import so repeated scans skip re's per-call cache lookup
+STOP_RE = re.compile(r'\*\[STOP\]\*\s*CONTEXT:\s*"([^"]+)"\s*([\s\S]+)')
+
+CACHE = LLMCache()
+
+# Static prompt content, kept byte-identical across runs and placed before
+# anything dynamic so DeepSeek's server-side prefix caching can reuse it
+SYSTEM_MSG = {
+    "role": "system",
+    "content": "You are a helpful assistant that can interact with OpenHands. You can use special commands like *[STOP]* CONTEXT: \"reason\" to stop the OpenHands agent and provide corrections."
+}
+STOP_INSTRUCTIONS = """I need you to review this task and provide guidance. If you see any issues with the approach or need to stop the OpenHands agent, use the command: *[STOP]* CONTEXT: "reason here" followed by your explanation."""
+
+# Immutable request skeleton built once; per-call payloads only append
+# the user message instead of re-allocating the whole dict
+_STATIC_PAYLOAD = {
+    "model": "deepseek-chat",
+    "messages": [SYSTEM_MSG],
+    "stream": True
+}
+
+DEEPSEEK_HEADERS = {
+    "Authorization": f"Bearer {DEEPSEEK_API_KEY}",
+    "Content-Type": "application/json"
+}
+
+async def create_openhands_conversation(client, repository, branch, first_prompt):
     """Create a new OpenHands conversation with initial message"""
     url = f"{OPENHANDS_API_URL}conversations"
-    
+
     payload = {
         "repository": repository,
         "initial_user_msg": first_prompt
     }
-    
+
     print(f"Creating OpenHands conversation...")
     print(f"Repository: {repository}")
     print(f"Initial message: {first_prompt[:100]}...")
-    
-    response = requests.post(url, json=payload)
-    
+
+    response = await client.post(url, json=payload)
+
     if response.status_code == 200:
-        data = response.json()
+        data = orjson.loads(response.content)
         conversation_id = data.get("conversation_id")
         print(f"✓ Conversation created: {conversation_id}")
         return conversation_id
@@ -37,14 +70,14 @@ def create_openhands_conversation(repository, branch, first_prompt):
         print(f"Response: {response.text}")
         return None
 
-def get_conversation_status(conversation_id):
+async def get_conversation_status(client, conversation_id):
     """Get the status of a conversation"""
     url = f"{OPENHANDS_API_URL}conversations/{conversation_id}"
-    
-    response = requests.get(url)
-    
+
+    response = await client.get(url)
+
     if response.status_code == 200:
-        data = response.json()
+        data = orjson.loads(response.content)
         status = data.get("status")
         print(f"Conversation status: {status}")
         return status, data
@@ -52,98 +85,138 @@ def get_conversation_status(conversation_id):
         print(f"✗ Failed to get conversation status: {response.status_code}")
         return None, None
 
-def send_to_deepseek(prompt):
-    """Send prompt to DeepSeek API"""
-    url = "https://api.deepseek.com/chat/completions"
-    
-    headers = {
-        "Authorization": f"Bearer {DEEPSEEK_API_KEY}",
-        "Content-Type": "application/json"
-    }
-    
+async def send_to_deepseek(client, prompt):
+    """Send prompt to DeepSeek API and stream the response"""
+    url = DEEPSEEK_URL
+
     payload = {
-        "model": "deepseek-chat",
-        "messages": [
-            {"role": "system", "content": "You are a helpful assistant that can interact with OpenHands. You can use special commands like *[STOP]* CONTEXT: \"reason\" to stop the OpenHands agent and provide corrections."},
-            {"role": "user", "content": prompt}
-        ],
-        "stream": False
+        **_STATIC_PAYLOAD,
+        "messages": _STATIC_PAYLOAD["messages"] + [{"role": "user", "content": STOP_INSTRUCTIONS + "\n\n" + prompt}]
     }
-    
+
     print(f"Sending to DeepSeek...")
-    
-    response = requests.post(url, headers=headers, json=payload)
-    
-    if response.status_code == 200:
-        data = response.json()
-        content = data["choices"][0]["message"]["content"]
-        print(f"✓ DeepSeek response received ({len(content)} chars)")
-        return content
-    else:
-        print(f"✗ DeepSeek API error: {response.status_code}")
-        print(f"Response: {response.text}")
-        return None
 
-def test_flow():
-    """Test the complete flow"""
+    # Identical payloads hit the on-disk cache and skip the API entirely
+    cache_key = LLMCache.key_for(payload)
+    cached = CACHE.get(cache_key) if LLMCache.cacheable(payload) else None
+    if cached is not None:
+        print(f"✓ Cache hit ({CACHE.stats()})")
+        return cached
+
+    async with client.stream("POST", url, headers=DEEPSEEK_HEADERS, json=payload) as response:
+        if response.status_code != 200:
+            body = await response.aread()
+            print(f"✗ DeepSeek API error: {response.status_code}")
+            print(f"Response: {body.decode(errors='replace')}")
+            return None
+
+        # Scan the SSE stream incrementally so a STOP command is
+        # detected on its first chunk instead of after the full reply
+        content = ""
+        stopped_early = False
+        async for line in response.aiter_lines():
+            if not line or not line.startswith("data: "):
+                continue
+            chunk = line[len("data: "):]
+            if chunk == "[DONE]":
+                break
+            obj = orjson.loads(chunk)
+            delta = obj["choices"][0]["delta"].get("content") if obj["choices"] else None
+            if delta:
+                content += delta
+                if STOP_RE.search(content):
+                    stopped_early = True
+                    break
+
+    if stopped_early:
+        print("✓ STOP marker seen mid-stream, aborted remaining completion")
+    print(f"✓ DeepSeek response received ({len(content)} chars)")
+    # Only cache full completions
+    if not stopped_early and LLMCache.cacheable(payload):
+        CACHE.set(cache_key, content)
+    return content
+
+async def run_flow():
+    """Run the complete flow"""
     print("=" * 60)
     print("Testing DeepSeek Agent Flow")
     print("=" * 60)
-    
+
     # Test parameters
     repository = "Alyahmed89/eta"
     branch = "fix-eslint-unused-params"
     first_prompt = "Create a simple web server with Node.js. Monitor for security issues."
-    
-    # Step 1: Create OpenHands conversation
-    conversation_id = create_openhands_conversation(repository, branch, first_prompt)
-    
-    if not conversation_id:
-        print("Failed to create conversation. Exiting.")
-        return
-    
-    # Step 2: Wait for conversation to be ready
-    print("\nWaiting for conversation to process...")
-    for i in range(10):
-        status, data = get_conversation_status(conversation_id)
-        
-        if status == "READY":
-            print("✓ Conversation is ready!")
-            break
-        elif status == "ERROR":
-            print("✗ Conversation failed")
+
+    # Shared HTTP/2 client: concurrent calls multiplex over one TLS connection
+    async with httpx.AsyncClient(
+        timeout=30,
+        transport=async_transport(limits=httpx.Limits(max_keepalive_connections=20))
+    ) as client:
+        # Step 1: Create OpenHands conversation
+        conversation_id = await create_openhands_conversation(client, repository, branch, first_prompt)
+
+        if not conversation_id:
+            print("Failed to create conversation. Exiting.")
             return
-        
-        print(f"Waiting... ({i+1}/10)")
-        time.sleep(2)
-    
-    # Step 3: Get conversation details to send to DeepSeek
-    if status == "READY":
-        # In a real scenario, we'd get the conversation history
-        # For now, just send the initial prompt
-        deepseek_response = send_to_deepseek(first_prompt)
-        
-        if deepseek_response:
-            print("\n" + "=" * 60)
-            print("DeepSeek Response:")
-            print("=" * 60)
-            print(deepseek_response[:500] + "..." if len(deepseek_response) > 500 else deepseek_response)
-            
-            # Check for STOP command
-            if "*[STOP]*" in deepseek_response:
-                print("\n⚠️  STOP command detected in response!")
-                # Parse STOP command
-                import re
-                stop_match = re.search(r'\*\[STOP\]\*\s*CONTEXT:\s*"([^"]+)"\s*([\s\S]+)', deepseek_response)
+
+        # Step 2: Wait for conversation to be ready, polling with
+        # exponential backoff so a fast conversation is caught in ~100ms
+        # instead of a fixed 2s granularity
+        print("\nWaiting for conversation to process...")
+        deepseek_task = None
+        delay = 0.1
+        while delay < 30:
+            status, data = await get_conversation_status(client, conversation_id)
+
+            if status == "READY":
+                print("✓ Conversation is ready!")
+                # Kick off the DeepSeek call immediately so it overlaps
+                # any further OpenHands work
+                deepseek_task = asyncio.create_task(send_to_deepseek(client, first_prompt))
+                break
+            elif status == "ERROR":
+                print("✗ Conversation failed")
+                return
+
+            print(f"Waiting {delay:.1f}s...")
+            await asyncio.sleep(delay)
+            delay *= 1.7
+        else:
+            print("✗ Timed out waiting for conversation to become ready")
+
+        # Step 3: Collect the DeepSeek response
+        if deepseek_task:
+            # In a real scenario, we'd get the conversation history
+            # For now, just send the initial prompt
+            deepseek_response = await deepseek_task
+
+            if deepseek_response:
+                print("\n" + "=" * 60)
+                print("DeepSeek Response:")
+                print("=" * 60)
+                # Write the preview in slices instead of building a
+                # truncated copy just to print and discard it
+                sys.stdout.write(deepseek_response[:500])
+                sys.stdout.write("...\n" if len(deepseek_response) > 500 else "\n")
+
+                # Check for STOP command: one regex pass instead of a
+                # substring scan followed by a second walk for the regex
+                stop_match = STOP_RE.search(deepseek_response)
                 if stop_match:
+                    print("\n⚠️  STOP command detected in response!")
                     context = stop_match.group(1)
                     message = stop_match.group(2)
                     print(f"Context: {context}")
                     print(f"Message: {message[:200]}...")
-    
+
     print("\n" + "=" * 60)
     print("Test complete!")
     print("=" * 60)
 
+@pytest.mark.integration
+def test_flow():
+    """Test the complete flow end to end"""
+    asyncio.run(run_flow())
+
 if __name__ == "__main__":
-    test_flow()
\ No newline at end of file
+    asyncio.run(run_flow())
@@ -1,32 +1,60 @@
 #!/usr/bin/env python3
-import requests
-import json
+import http.client
 import time
 
+import orjson
+import pytest
+
+HOST = "localhost"
+PORT = 8787
+
+def wait_for_server(timeout=10.0):
+    """Probe until the dev server accepts connections instead of sleeping a fixed 3s"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection(HOST, PORT, timeout=1)
+            conn.connect()
+            conn.close()
+            return True
+        except OSError:
+            time.sleep(0.1)
+    return False
+
+@pytest.mark.integration
 def test_endpoint():
-    url = "http://localhost:8787/start"
     data = {
         "conversation_id": "test123",
         "first_prompt": "Test prompt for DeepSeek"
     }
-    
-    print(f"Testing endpoint: {url}")
-    print(f"Data: {json.dumps(data, indent=2)}")
+
+    print(f"Testing endpoint: http://{HOST}:{PORT}/start")
+    print(f"Data: {orjson.dumps(data, option=orjson.OPT_INDENT_2).decode()}")
     print("-" * 50)
-    
+
+    # http.client avoids the requests/urllib3 import chain (~200ms cold
+    # start) for this single localhost POST
+    conn = http.client.HTTPConnection(HOST, PORT, timeout=30)
     try:
-        response = requests.post(url, json=data, timeout=30)
-        print(f"Status: {response.status_code}")
-        print(f"Response: {json.dumps(response.json(), indent=2)}")
-    except requests.exceptions.Timeout:
+        conn.request("POST", "/start", orjson.dumps(data), {"Content-Type": "application/json"})
+        response = conn.getresponse()
+        body = response.read()
+        print(f"Status: {response.status}")
+        try:
+            print(f"Response: {orjson.dumps(orjson.loads(body), option=orjson.OPT_INDENT_2).decode()}")
+        except orjson.JSONDecodeError as e:
+            print(f"JSON decode error: {e}")
+            print(f"Raw response: {body.decode(errors='replace')}")
+    except TimeoutError:
         print("Request timed out after 30 seconds")
-    except requests.exceptions.RequestException as e:
+    except OSError as e:
         print(f"Request error: {e}")
-    except json.JSONDecodeError as e:
-        print(f"JSON decode error: {e}")
-        print(f"Raw response: {response.text}")
+    finally:
+        conn.close()
 
 if __name__ == "__main__":
     print("Waiting for server to be ready...")
-    time.sleep(3)
-    test_endpoint()
\ No newline at end of file
+    if wait_for_server():
+        test_endpoint()
+    else:
+        print("Server did not become ready in time")
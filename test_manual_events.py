@@ -9,41 +9,89 @@ Usage:
 4. Run this script to forward to DeepSeek
 """
 
-import json
-import requests
+import asyncio
+import gzip
+
+import httpx
+import orjson
+import pytest
+
+from transport import async_transport, transport
+
+# uvloop's C event loop cuts selector overhead when forwarding many
+# events; fall back to the stdlib loop where it isn't installed
+try:
+    import uvloop
+    uvloop.install()
+except ImportError:
+    pass
 
 # Configuration
 WORKER_URL = "https://deepseek-agent.alghamdimo89.workers.dev"
 CONVERSATION_ID = "your-conversation-id-here"  # Replace with your OpenHands conversation ID
 
+_JSON_HEADERS = {"Content-Type": "application/json"}
+_GZIP_HEADERS = {"Content-Type": "application/json", "Content-Encoding": "gzip"}
+# Bodies smaller than one MSS gain nothing from compression
+_COMPRESS_MIN = 1400
+
+def encode_body(data):
+    """Serialize a payload, gzip-compressing bodies worth compressing
+
+    Event content can be multi-KB code blobs that compress 5-10x;
+    Cloudflare Workers decode Content-Encoding: gzip transparently.
+    Level 1 is CPU-cheap and captures most of the ratio.
+    """
+    raw = orjson.dumps(data)
+    if len(raw) < _COMPRESS_MIN:
+        return raw, _JSON_HEADERS
+    return gzip.compress(raw, compresslevel=1), _GZIP_HEADERS
+
+@pytest.mark.integration
 def test_start_monitoring():
     """Start monitoring an existing OpenHands conversation"""
     print("=== Starting DeepSeek Monitoring ===")
-    
+
     data = {
         "conversation_id": CONVERSATION_ID,
         "task": "Task that OpenHands is working on",
         "rules": "Monitor for security issues. Stop if insecure code is written."
     }
-    
-    response = requests.post(f"{WORKER_URL}/start", json=data)
+
+    with httpx.Client(timeout=30, transport=transport()) as client:
+        response = client.post(f"{WORKER_URL}/start", json=data)
     print(f"Status: {response.status_code}")
-    print(f"Response: {json.dumps(response.json(), indent=2)}")
-    return response.json()
+    result = orjson.loads(response.content)
+    print(f"Response: {orjson.dumps(result, option=orjson.OPT_INDENT_2).decode()}")
+    return result
 
-def test_forward_event(event_data):
+async def forward_event(client, event_data):
     """Forward an OpenHands event to DeepSeek"""
     print("\n=== Forwarding Event to DeepSeek ===")
-    
+
     data = {
         "conversation_id": CONVERSATION_ID,
         "event": event_data
     }
-    
-    response = requests.post(f"{WORKER_URL}/events", json=data)
+
+    body, headers = encode_body(data)
+    response = await client.post(f"{WORKER_URL}/events", content=body, headers=headers)
     print(f"Status: {response.status_code}")
-    print(f"Response: {json.dumps(response.json(), indent=2)}")
-    return response.json()
+    result = orjson.loads(response.content)
+    print(f"Response: {orjson.dumps(result, option=orjson.OPT_INDENT_2).decode()}")
+    return result
+
+async def forward_events(events):
+    """Forward many OpenHands events concurrently over one HTTP/2 connection"""
+    print(f"\n=== Forwarding {len(events)} events to DeepSeek ===")
+
+    # Latency is network-bound, so gathering the POSTs overlaps their
+    # round-trips instead of paying them one after another
+    async with httpx.AsyncClient(
+        timeout=30,
+        transport=async_transport(limits=httpx.Limits(max_connections=64))
+    ) as client:
+        return await asyncio.gather(*(forward_event(client, event) for event in events))
 
 # Example event from OpenHands (you would get this from OpenHands UI)
 EXAMPLE_EVENT = {
@@ -56,17 +104,34 @@ EXAMPLE_EVENT = {
     }
 }
 
+@pytest.mark.integration
+def test_forward_event():
+    """Forward the example event through the Worker"""
+    asyncio.run(forward_events([EXAMPLE_EVENT]))
+
+def test_encode_body_keeps_small_payloads_plain():
+    body, headers = encode_body({"conversation_id": "abc"})
+    assert "Content-Encoding" not in headers
+    assert orjson.loads(body) == {"conversation_id": "abc"}
+
+def test_encode_body_compresses_large_payloads():
+    data = {"event": {"content": "const x = 1;\n" * 500}}
+    body, headers = encode_body(data)
+    assert headers["Content-Encoding"] == "gzip"
+    assert len(body) < len(orjson.dumps(data))
+    assert orjson.loads(gzip.decompress(body)) == data
+
 if __name__ == "__main__":
     print("DeepSeek Agent Manual Testing")
     print("=" * 50)
-    
+
     # Step 1: Start monitoring
     # result = test_start_monitoring()
-    
+
     # Step 2: Forward an event (after OpenHands does something)
     print("\nExample: Forwarding a code event to DeepSeek")
-    result = test_forward_event(EXAMPLE_EVENT)
-    
+    result = asyncio.run(forward_events([EXAMPLE_EVENT]))
+
     print("\n" + "=" * 50)
     print("How to get real events from OpenHands:")
     print("1. Open OpenHands UI")
@@ -74,4 +139,4 @@ if __name__ == "__main__":
     print("3. When agent writes code or takes action")
     print("4. Copy the event data (type, content, source)")
     print("5. Update EXAMPLE_EVENT with real data")
-    print("6. Run this script again")
\ No newline at end of file
+    print("6. Run this script again")